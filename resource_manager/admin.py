@@ -1,16 +1,43 @@
 """Admin configuration for SACK Resource Management Tool"""
 from django.contrib import admin
-from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils import timezone
 from .models import Resource, ResourceUsage, ResourceQueue, UserSession, SystemLog
+from .status_cache import bump_status_version
 
 # Customize the admin site header and title
 admin.site.site_header = "SACK Tool Administration"
 admin.site.site_title = "SACK Tool Admin"
 admin.site.index_title = "Resource Management System"
 
+class FasterAdminPaginator(Paginator):
+    """Paginator that estimates the row count of unfiltered changelists.
+
+    On PostgreSQL the planner's row estimate from pg_class is used instead of
+    a full COUNT(*) on large append-only tables. Filtered querysets and other
+    database backends fall back to the exact count.
+    """
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [query.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # reltuples is -1/0 until the table has been analyzed
+            if row and row[0] > 0:
+                return row[0]
+        return super().count
+
 @admin.register(Resource)
 class ResourceAdmin(admin.ModelAdmin):
     list_display = [
@@ -35,6 +62,22 @@ class ResourceAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Annotate queue size / occupancy and prefetch active usages so the
+        # display columns below don't fire a query per row
+        return super().get_queryset(request).annotate(
+            _queue_count=Count('queue_entries', filter=Q(queue_entries__is_active=True)),
+            _has_active_usage=Exists(
+                ResourceUsage.objects.filter(resource=OuterRef('pk'), end_time__isnull=True)
+            ),
+        ).prefetch_related(
+            Prefetch(
+                'usages',
+                queryset=ResourceUsage.objects.filter(end_time__isnull=True).select_related('user'),
+                to_attr='_active_usages'
+            ),
+        )
+
     def status_display(self, obj):
         colors = {
             'Available': 'green',
@@ -49,7 +92,7 @@ class ResourceAdmin(admin.ModelAdmin):
     status_display.short_description = 'Status'
 
     def current_user_display(self, obj):
-        usage = obj.get_current_usage()
+        usage = obj.current_usage
         if usage:
             return format_html(
                 '<span style="color: blue;">👤 {}</span>',
@@ -57,9 +100,10 @@ class ResourceAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: gray">-</span>')
     current_user_display.short_description = 'Current User'
+    current_user_display.admin_order_field = '_has_active_usage'
 
     def queue_count_display(self, obj):
-        count = obj.get_queue_count()
+        count = obj.queue_count
         if count > 0:
             return format_html(
                 '<span style="color: orange; font-weight: bold;">👥 {}</span>',
@@ -67,6 +111,7 @@ class ResourceAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: gray">-</span>')
     queue_count_display.short_description = 'Queue'
+    queue_count_display.admin_order_field = '_queue_count'
 
 @admin.register(ResourceUsage)
 class ResourceUsageAdmin(admin.ModelAdmin):
@@ -76,21 +121,38 @@ class ResourceUsageAdmin(admin.ModelAdmin):
     ]
     list_filter = ['is_active', 'auto_released', 'resource__resource_type', 'start_time']
     search_fields = ['resource__pc_name', 'user__username']
-    readonly_fields = ['start_time', 'actual_duration']
-    date_hierarchy = 'start_time'
+    readonly_fields = ['start_time', 'deadline', 'actual_duration']
+    list_select_related = ['resource', 'user']
+    autocomplete_fields = ['resource', 'user']
+    paginator = FasterAdminPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Session Information', {
             'fields': ('resource', 'user', 'start_time', 'end_time')
         }),
         ('Duration Settings', {
-            'fields': ('planned_duration', 'extended_time', 'actual_duration')
+            'fields': ('planned_duration', 'extended_time', 'deadline', 'actual_duration')
         }),
         ('Status', {
             'fields': ('is_active', 'auto_released')
         }),
     )
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match is None or not match.url_name.endswith('_changelist'):
+            # The change form and other views need every column
+            return queryset
+        # Fetch only the columns the changelist renders, including the
+        # joined resource/user fields used by their __str__
+        return queryset.only(
+            'id', 'resource', 'user', 'start_time', 'end_time', 'planned_duration',
+            'deadline', 'is_active', 'auto_released',
+            'resource__pc_name', 'resource__ip_address', 'user__username'
+        )
+
     def planned_duration_display(self, obj):
         total_seconds = obj.planned_duration.total_seconds()
         hours = int(total_seconds // 3600)
@@ -112,6 +174,7 @@ class ResourceUsageAdmin(admin.ModelAdmin):
         else:
             return format_html('<span style="color: red">Expired</span>')
     remaining_time_display.short_description = 'Remaining'
+    remaining_time_display.admin_order_field = 'deadline'
 
     def status_display(self, obj):
         if obj.end_time:
@@ -143,16 +206,32 @@ class ResourceQueueAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'resource__resource_type', 'joined_at']
     search_fields = ['resource__pc_name', 'user__username']
     readonly_fields = ['joined_at', 'position']
+    list_select_related = ['resource', 'user']
+    autocomplete_fields = ['resource', 'user']
+
+    def get_queryset(self, request):
+        # Compute queue positions in the changelist query itself. A correlated
+        # count is used rather than ROW_NUMBER() so positions stay correct when
+        # the changelist is searched or filtered.
+        ahead = ResourceQueue.objects.filter(
+            resource=OuterRef('resource'),
+            is_active=True,
+            joined_at__lt=OuterRef('joined_at')
+        ).order_by().values('resource').annotate(c=Count('pk')).values('c')
+        return super().get_queryset(request).annotate(
+            _position=Coalesce(Subquery(ahead, output_field=IntegerField()), Value(0)) + 1
+        )
 
     def position_display(self, obj):
         if obj.is_active:
-            position = obj.get_position()
+            position = obj._position
             return format_html(
                 '<span style="color: orange; font-weight: bold;">#{}</span>',
                 position
             )
         return format_html('<span style="color: gray">Inactive</span>')
     position_display.short_description = 'Position'
+    position_display.admin_order_field = '_position'
 
     def estimated_wait_display(self, obj):
         if obj.estimated_wait_time:
@@ -174,12 +253,19 @@ class UserSessionAdmin(admin.ModelAdmin):
     list_filter = ['notification_enabled', 'browser_notifications', 'last_activity']
     search_fields = ['user__username']
     readonly_fields = ['last_activity']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _active_sessions=Count(
+                'user__resource_usages',
+                filter=Q(user__resource_usages__end_time__isnull=True)
+            )
+        )
 
     def active_sessions_count(self, obj):
-        count = ResourceUsage.objects.filter(
-            user=obj.user,
-            end_time__isnull=True
-        ).count()
+        count = obj._active_sessions
         if count > 0:
             return format_html(
                 '<span style="color: green; font-weight: bold;">🔴 {}</span>',
@@ -187,6 +273,7 @@ class UserSessionAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: gray">-</span>')
     active_sessions_count.short_description = 'Active Sessions'
+    active_sessions_count.admin_order_field = '_active_sessions'
 
 @admin.register(SystemLog)
 class SystemLogAdmin(admin.ModelAdmin):
@@ -196,7 +283,10 @@ class SystemLogAdmin(admin.ModelAdmin):
     list_filter = ['log_type', 'timestamp', 'resource__resource_type']
     search_fields = ['message', 'user__username', 'resource__pc_name']
     readonly_fields = ['timestamp']
-    date_hierarchy = 'timestamp'
+    list_select_related = ['resource', 'user']
+    autocomplete_fields = ['user', 'resource']
+    paginator = FasterAdminPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Log Information', {
@@ -224,37 +314,25 @@ class SystemLogAdmin(admin.ModelAdmin):
         return format_html('<span style="color: gray">-</span>')
     details_display.short_description = 'Details'
 
-# Extend User Admin to show resource-related information
-class UserAdminExtended(BaseUserAdmin):
-    def get_inline_instances(self, request, obj=None):
-        inline_instances = super().get_inline_instances(request, obj)
-        if obj:
-            # Add custom inlines for resource usage
-            pass
-        return inline_instances
-
-# Unregister the original User admin and register the extended one
-admin.site.unregister(User)
-admin.site.register(User, UserAdminExtended)
-
 # Custom admin actions
 def release_expired_sessions(modeladmin, request, queryset):
     """Admin action to release expired sessions"""
-    count = 0
-    for usage in queryset.filter(end_time__isnull=True):
-        if usage.is_expired():
-            usage.end_time = timezone.now()
-            usage.auto_released = True
-            usage.is_active = False
-            usage.save()
-
-            # Update resource status
-            resource = usage.resource
-            if not resource.usages.filter(end_time__isnull=True).exists():
-                resource.status = 'Available'
-                resource.save()
-
-            count += 1
+    now = timezone.now()
+    with transaction.atomic():
+        expired = list(
+            queryset.filter(end_time__isnull=True, deadline__lte=now).values_list('id', 'resource_id')
+        )
+        count = ResourceUsage.objects.filter(id__in=[pk for pk, _ in expired]).update(
+            end_time=now,
+            auto_released=True,
+            is_active=False
+        )
+
+        # Free the affected resources that have no other open usage
+        Resource.objects.filter(id__in={resource_id for _, resource_id in expired}).exclude(
+            Exists(ResourceUsage.objects.filter(resource=OuterRef('pk'), end_time__isnull=True))
+        ).update(status='Available', updated_at=now)
+        transaction.on_commit(bump_status_version)
 
     modeladmin.message_user(request, f"Released {count} expired sessions.")
 
@@ -1,7 +1,9 @@
 """Management command to create sample resources and users"""
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from resource_manager.models import Resource
+from django.db.models import Q
+from resource_manager.models import Resource, UserProfile
 
 class Command(BaseCommand):
     help = 'Create sample data for SACK Tool'
@@ -16,35 +18,60 @@ class Command(BaseCommand):
             User.objects.create_superuser('admin', 'admin@sack.com', 'admin123')
             self.stdout.write(self.style.SUCCESS('Created superuser: admin/admin123'))
 
-        # Create sample users
-        for i in range(1, options['users'] + 1):
-            username = f'user{i}'
-            if not User.objects.filter(username=username).exists():
-                user = User.objects.create_user(
-                    username=username,
-                    email=f'{username}@sack.com',
-                    password='password123'
-                )
-                self.stdout.write(self.style.SUCCESS(f'Created user: {username}/password123'))
+        # Create sample users (hash the shared password once)
+        usernames = [f'user{i}' for i in range(1, options['users'] + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        password = make_password('password123')
+        new_users = [
+            User(username=username, email=f'{username}@sack.com', password=password)
+            for username in usernames if username not in existing
+        ]
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+
+        # bulk_create skips post_save, so create the profiles explicitly
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user) for user in User.objects.filter(
+                username__in=usernames, profile__isnull=True
+            )],
+            ignore_conflicts=True
+        )
+        for user in new_users:
+            self.stdout.write(self.style.SUCCESS(f'Created user: {user.username}/password123'))
 
         # Create sample resources
         resource_types = ['Windows', 'Ubuntu', 'Linux']
         base_ips = ['107.109.113.', '107.108.83.', '107.108.59.', '107.108.221.', '107.109.114.']
 
+        resources = []
         for i in range(1, options['resources'] + 1):
             pc_name = f"{'Windows' if i % 3 == 0 else 'Ubuntu' if i % 2 == 0 else 'Linux'} {239 + i}"
             ip_base = base_ips[i % len(base_ips)]
             ip_address = f"{ip_base}{239 + i}"
             resource_type = resource_types[i % len(resource_types)]
 
-            if not Resource.objects.filter(ip_address=ip_address).exists():
-                resource = Resource.objects.create(
-                    pc_name=pc_name.strip(),
-                    ip_address=ip_address,
-                    resource_type=resource_type,
-                    status='Available',
-                    is_active=True
-                )
-                self.stdout.write(self.style.SUCCESS(f'Created resource: {resource.pc_name} ({resource.ip_address})'))
-
-        self.stdout.write(self.style.SUCCESS('\nSample data created successfully!'))
\ No newline at end of file
+            resources.append(Resource(
+                pc_name=pc_name.strip(),
+                ip_address=ip_address,
+                resource_type=resource_type,
+                status='Available',
+                is_active=True
+            ))
+
+        # Skip rows that would collide on either unique column
+        existing_names = set()
+        existing_ips = set()
+        for pc_name, ip_address in Resource.objects.filter(
+            Q(pc_name__in=[resource.pc_name for resource in resources]) |
+            Q(ip_address__in=[resource.ip_address for resource in resources])
+        ).values_list('pc_name', 'ip_address'):
+            existing_names.add(pc_name)
+            existing_ips.add(ip_address)
+        new_resources = [
+            resource for resource in resources
+            if resource.pc_name not in existing_names and resource.ip_address not in existing_ips
+        ]
+        Resource.objects.bulk_create(new_resources, ignore_conflicts=True)
+        for resource in new_resources:
+            self.stdout.write(self.style.SUCCESS(f'Created resource: {resource.pc_name} ({resource.ip_address})'))
+
+        self.stdout.write(self.style.SUCCESS('\nSample data created successfully!'))
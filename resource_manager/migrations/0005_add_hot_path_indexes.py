@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-15 07:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_manager', '0004_merge_20251008_0103'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resourcequeue',
+            index=models.Index(fields=['resource', 'is_active', 'joined_at'], name='resource_ma_resourc_143bcb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourceusage',
+            index=models.Index(condition=models.Q(('end_time__isnull', True)), fields=['resource', 'is_active', 'end_time'], name='ru_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourceusage',
+            index=models.Index(fields=['user', 'end_time'], name='resource_ma_user_id_8b4f5e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['-timestamp', 'log_type'], name='resource_ma_timesta_1da8b4_idx'),
+        ),
+    ]
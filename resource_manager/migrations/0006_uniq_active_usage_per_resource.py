@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-15 07:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def deactivate_duplicate_usages(apps, schema_editor):
+    """Keep only the most recent open usage per resource before adding the constraint"""
+    ResourceUsage = apps.get_model('resource_manager', 'ResourceUsage')
+    duplicate_ids = list(
+        ResourceUsage.objects.filter(is_active=True, end_time__isnull=True).annotate(
+            rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('resource_id')],
+                order_by=F('start_time').desc()
+            )
+        ).filter(rank__gt=1).values_list('id', flat=True)
+    )
+    ResourceUsage.objects.filter(id__in=duplicate_ids).update(
+        is_active=False,
+        end_time=F('start_time'),
+        auto_released=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_manager', '0005_add_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(deactivate_duplicate_usages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='resourceusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True), ('is_active', True)), fields=('resource',), name='uniq_active_usage_per_resource'),
+        ),
+    ]
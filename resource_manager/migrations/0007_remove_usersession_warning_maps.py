@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 07:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_manager', '0006_uniq_active_usage_per_resource'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='usersession',
+            name='first_warning_shown',
+        ),
+        migrations.RemoveField(
+            model_name='usersession',
+            name='second_warning_shown',
+        ),
+    ]
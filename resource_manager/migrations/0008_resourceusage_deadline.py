@@ -0,0 +1,38 @@
+"""Add a stored deadline column to ResourceUsage"""
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import DateTimeField, ExpressionWrapper, F
+
+
+def populate_deadline(apps, schema_editor):
+    ResourceUsage = apps.get_model('resource_manager', 'ResourceUsage')
+    ResourceUsage.objects.update(deadline=ExpressionWrapper(
+        F('start_time') + F('planned_duration') + F('extended_time'),
+        output_field=DateTimeField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_manager', '0007_remove_usersession_warning_maps'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resourceusage',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resourceusage',
+            name='deadline',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_deadline, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='resourceusage',
+            name='deadline',
+            field=models.DateTimeField(db_index=True, editable=False),
+        ),
+    ]
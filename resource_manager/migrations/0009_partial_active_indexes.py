@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-15 07:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_manager', '0008_resourceusage_deadline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resourcequeue',
+            name='resource_ma_resourc_143bcb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='resourcequeue',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['resource', 'joined_at'], name='queue_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourceusage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['resource', 'user'], name='ru_active_user_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-15 07:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_manager', '0009_partial_active_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='resourcequeue',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='resourcequeue',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('resource', 'user'), name='one_active_queue_entry'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 """Resource Management Models for SACK Tool"""
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.functional import cached_property
 from datetime import timedelta
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -37,11 +39,25 @@ class Resource(models.Model):
     def __str__(self):
         return f"{self.pc_name} ({self.ip_address})"
 
-    def get_current_usage(self):
+    def get_current_usage(self, use_cache=False):
         """Get current usage session if resource is occupied"""
+        if use_cache:
+            return self.current_usage
         # Return the most recent active usage if any
         return self.usages.filter(end_time__isnull=True).order_by('-start_time').first()
 
+    @cached_property
+    def current_usage(self):
+        """Current usage, cached on the instance for the rest of the request.
+
+        Uses the `_active_usages` list when it was prefetched (newest first),
+        otherwise queries once. Use get_current_usage() where the instance
+        outlives a single request (tasks, signals).
+        """
+        if hasattr(self, '_active_usages'):
+            return self._active_usages[0] if self._active_usages else None
+        return self.get_current_usage()
+
     def is_available(self):
         """Check if resource is available for use"""
         return self.status == 'Available' and self.is_active
@@ -50,36 +66,83 @@ class Resource(models.Model):
         """Get number of users in queue for this resource"""
         return self.queue_entries.filter(is_active=True).count()
 
+    @cached_property
+    def queue_count(self):
+        """Active queue size, cached on the instance (uses `_queue_count` if annotated)"""
+        if hasattr(self, '_queue_count'):
+            return self._queue_count
+        return self.get_queue_count()
+
+class ResourceUsageQuerySet(models.QuerySet):
+    """QuerySet helpers for resource usage sessions"""
+
+    def expired(self, now=None):
+        """Open, active usages whose deadline has passed (evaluated in SQL)"""
+        return self.filter(
+            end_time__isnull=True,
+            is_active=True,
+            deadline__lte=now or timezone.now()
+        )
+
 class ResourceUsage(models.Model):
     """Model to track resource usage sessions"""
     resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='usages')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resource_usages')
-    start_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(default=timezone.now, editable=False)
     end_time = models.DateTimeField(null=True, blank=True)
     planned_duration = models.DurationField(default=timedelta(hours=1))
     actual_duration = models.DurationField(null=True, blank=True)
     extended_time = models.DurationField(default=timedelta(0))
+    # start_time + planned_duration + extended_time, maintained by save()
+    deadline = models.DateTimeField(db_index=True, editable=False)
     is_active = models.BooleanField(default=True)
     auto_released = models.BooleanField(default=False)
 
+    objects = ResourceUsageQuerySet.as_manager()
+
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Partial index for the "active usage" hot path
+            models.Index(
+                fields=['resource', 'is_active', 'end_time'],
+                name='ru_active_idx',
+                condition=Q(end_time__isnull=True)
+            ),
+            models.Index(fields=['user', 'end_time']),
+            # (resource, user, is_active) lookups for the caller's own session
+            models.Index(
+                fields=['resource', 'user'],
+                name='ru_active_user_idx',
+                condition=Q(is_active=True)
+            ),
+        ]
+        constraints = [
+            # At most one open, active usage per resource
+            models.UniqueConstraint(
+                fields=['resource'],
+                condition=Q(is_active=True, end_time__isnull=True),
+                name='uniq_active_usage_per_resource'
+            ),
+        ]
         verbose_name = 'Resource Usage'
         verbose_name_plural = 'Resource Usages'
 
     def __str__(self):
         return f"{self.user.username} - {self.resource.pc_name} ({self.start_time})"
 
+    def save(self, *args, **kwargs):
+        self.deadline = self.get_end_time()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'planned_duration', 'extended_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'deadline'}
+        super().save(*args, **kwargs)
+
     def get_remaining_time(self):
         """Calculate remaining time in seconds"""
         if self.end_time:
             return 0
-
-        total_duration = self.planned_duration + self.extended_time
-        elapsed = timezone.now() - self.start_time
-        remaining = total_duration - elapsed
-
-        return max(0, int(remaining.total_seconds()))
+        return max(0, int((self.deadline - timezone.now()).total_seconds()))
 
     def is_expired(self):
         """Check if the usage session has expired"""
@@ -93,18 +156,17 @@ class ResourceUsage(models.Model):
     def extend_time(self, extension_minutes=15):
         """Extend the usage time"""
         extension = timedelta(minutes=extension_minutes)
-        self.extended_time += extension
-        self.save()
-
-        # Also extend time for all users in queue
-        queue_entries = ResourceQueue.objects.filter(
-            resource=self.resource,
+        ResourceUsage.objects.filter(pk=self.pk).update(
+            extended_time=F('extended_time') + extension,
+            deadline=F('deadline') + extension
+        )
+        self.refresh_from_db(fields=['extended_time', 'deadline'])
+
+        # Also extend time for all users in queue (single UPDATE in the DB)
+        ResourceQueue.objects.filter(
+            resource_id=self.resource_id,
             is_active=True
-        ).order_by('joined_at')
-
-        for entry in queue_entries:
-            entry.estimated_wait_time += extension
-            entry.save()
+        ).update(estimated_wait_time=F('estimated_wait_time') + extension)
 
 class ResourceQueue(models.Model):
     """Model to manage resource waiting queue"""
@@ -119,7 +181,22 @@ class ResourceQueue(models.Model):
 
     class Meta:
         ordering = ['joined_at']
-        unique_together = ['resource', 'user', 'is_active']
+        constraints = [
+            # One live entry per user and resource; inactive history never collides
+            models.UniqueConstraint(
+                fields=['resource', 'user'],
+                condition=Q(is_active=True),
+                name='one_active_queue_entry'
+            ),
+        ]
+        indexes = [
+            # Only live entries are indexed, so the index stays small as history grows
+            models.Index(
+                fields=['resource', 'joined_at'],
+                name='queue_active_order_idx',
+                condition=Q(is_active=True)
+            ),
+        ]
         verbose_name = 'Resource Queue'
         verbose_name_plural = 'Resource Queues'
 
@@ -149,16 +226,13 @@ class ResourceQueue(models.Model):
             # estimated_time is remaining_time plus minutes requested by users ahead
             estimated_seconds = remaining_time + (ahead_minutes * 60)
             self.estimated_wait_time = timedelta(seconds=estimated_seconds)
-            self.save()
+            self.save(update_fields=['estimated_wait_time'])
 
     def requested_display(self):
         """Return a human-friendly string for requested_minutes, e.g. '1h 30m' or '45m'"""
-        h = self.requested_minutes // 60
-        m = self.requested_minutes % 60
-        if h > 0 and m > 0:
-            return f"{h}h {m}m"
-        if h > 0:
-            return f"{h}h"
+        h, m = divmod(self.requested_minutes, 60)
+        if h:
+            return f"{h}h {m}m" if m else f"{h}h"
         return f"{m}m"
 
 class UserSession(models.Model):
@@ -167,8 +241,6 @@ class UserSession(models.Model):
     last_activity = models.DateTimeField(auto_now=True)
     notification_enabled = models.BooleanField(default=True)
     browser_notifications = models.BooleanField(default=False)
-    first_warning_shown = models.JSONField(default=dict)  # {resource_id: datetime}
-    second_warning_shown = models.JSONField(default=dict)  # {resource_id: datetime}
 
     class Meta:
         verbose_name = 'User Session'
@@ -202,11 +274,6 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
-
 class SystemLog(models.Model):
     """Model to log system events and actions"""
     LOG_TYPES = [
@@ -227,6 +294,9 @@ class SystemLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', 'log_type']),
+        ]
         verbose_name = 'System Log'
         verbose_name_plural = 'System Logs'
 
@@ -0,0 +1,31 @@
+"""Short-lived cache for the get_status polling payload"""
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+STATUS_VERSION_KEY = 'resources:version'
+STATUS_CACHE_TIMEOUT = 3  # seconds
+
+
+def status_cache_key(user_id):
+    """Cache key for a user's status payload at the current resources version"""
+    return f'status:{user_id}:{cache.get(STATUS_VERSION_KEY, 0)}'
+
+
+def bump_status_version():
+    """Invalidate every cached status payload after a resource/queue change.
+
+    Best-effort: it runs after the change has committed, so a cache backend
+    error is logged rather than raised (stale payloads expire on their own).
+    """
+    try:
+        cache.add(STATUS_VERSION_KEY, 0)
+        try:
+            cache.incr(STATUS_VERSION_KEY)
+        except ValueError:
+            # Key was evicted between add() and incr()
+            cache.set(STATUS_VERSION_KEY, 1)
+    except Exception:
+        logger.exception('Could not bump the resource status cache version')
@@ -0,0 +1,22 @@
+"""SystemLog writes that can be moved off the request path"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import SystemLog
+
+
+def queue_system_log(**entry):
+    """Record a SystemLog entry off the request path.
+
+    With settings.SYSTEM_LOG_ASYNC the row is written by the Celery worker once
+    the surrounding transaction commits; otherwise it is written immediately.
+    Pass foreign keys as `user_id` / `resource_id` so the entry stays
+    JSON-serializable.
+    """
+    if settings.SYSTEM_LOG_ASYNC:
+        # Imported here so web processes only load Celery when they use it
+        from .tasks import write_system_logs
+        # robust: a broker error must not fail a request whose changes committed
+        transaction.on_commit(lambda: write_system_logs.delay([entry]), robust=True)
+    else:
+        SystemLog.objects.create(**entry)
@@ -1,71 +1,136 @@
 """Celery tasks for background processing"""
-from celery import shared_task
 from django.utils import timezone
 from django.db import transaction
-from .models import ResourceUsage, ResourceQueue, Resource, SystemLog
 from datetime import timedelta
 
+try:
+    from celery import shared_task
+except ImportError:
+    # Celery is only needed by the worker; keep this module importable without it
+    def shared_task(func):
+        return func
+
 @shared_task
 def cleanup_expired_sessions():
     """Clean up expired resource sessions"""
-    expired_count = 0
+    # Deferred until the task actually runs
+    from django.db.models import Prefetch
+    from .models import ResourceUsage, ResourceQueue, Resource, SystemLog
+    from .status_cache import bump_status_version
 
-    expired_usages = ResourceUsage.objects.filter(
-        end_time__isnull=True,
-        is_active=True
-    )
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Lock the expired usages; rows a concurrent release already holds are
+        # skipped and left to that release (or the next run)
+        expired_usages = list(
+            ResourceUsage.objects.expired(now).select_related('user')
+            .select_for_update(skip_locked=True, of=('self',))
+        )
+        if not expired_usages:
+            return "Cleaned up 0 expired sessions"
+
+        # Load the affected resources once, with their active queues in order
+        resources = Resource.objects.filter(
+            id__in={usage.resource_id for usage in expired_usages}
+        ).prefetch_related(Prefetch(
+            'queue_entries',
+            queryset=ResourceQueue.objects.filter(is_active=True).select_related('user').order_by('joined_at'),
+            to_attr='active_queue'
+        )).in_bulk()
+
+        new_usages = []
+        consumed_queue_ids = []
+        freed_resource_ids = []
+        logs = []
 
-    for usage in expired_usages:
-        if usage.is_expired():
-            with transaction.atomic():
-                # Mark as expired
-                usage.end_time = timezone.now()
-                usage.auto_released = True
-                usage.is_active = False
-                usage.actual_duration = usage.end_time - usage.start_time
-                usage.save()
-
-                # Handle queue
-                resource = usage.resource
-                next_in_queue = ResourceQueue.objects.filter(
+        for usage in expired_usages:
+            # Mark as expired
+            usage.end_time = now
+            usage.auto_released = True
+            usage.is_active = False
+            usage.actual_duration = usage.end_time - usage.start_time
+
+            # Handle queue
+            resource = resources[usage.resource_id]
+            if resource.active_queue:
+                next_in_queue = resource.active_queue.pop(0)
+
+                # Auto-assign to next user
+                # bulk_create bypasses save(), so set the deadline here
+                new_usages.append(ResourceUsage(
                     resource=resource,
-                    is_active=True
-                ).order_by('joined_at').first()
-
-                if next_in_queue:
-                    # Auto-assign to next user
-                    ResourceUsage.objects.create(
-                        resource=resource,
-                        user=next_in_queue.user,
-                        planned_duration=timedelta(hours=1)
-                    )
-                    next_in_queue.is_active = False
-                    next_in_queue.save()
-
-                    SystemLog.objects.create(
-                        log_type='SYSTEM',
-                        user=next_in_queue.user,
-                        resource=resource,
-                        message=f'Auto-assigned {resource.pc_name} from queue'
-                    )
-                else:
-                    # Make available
-                    resource.status = 'Available'
-                    resource.save()
-
-                SystemLog.objects.create(
+                    user=next_in_queue.user,
+                    start_time=now,
+                    planned_duration=timedelta(hours=1),
+                    deadline=now + timedelta(hours=1)
+                ))
+                consumed_queue_ids.append(next_in_queue.id)
+
+                logs.append(SystemLog(
                     log_type='SYSTEM',
-                    user=usage.user,
+                    user=next_in_queue.user,
                     resource=resource,
-                    message=f'Auto-expired session for {resource.pc_name}'
-                )
+                    message=f'Auto-assigned {resource.pc_name} from queue'
+                ))
+            else:
+                # Make available
+                freed_resource_ids.append(resource.id)
 
-                expired_count += 1
+            logs.append(SystemLog(
+                log_type='SYSTEM',
+                user=usage.user,
+                resource=resource,
+                message=f'Auto-expired session for {resource.pc_name}'
+            ))
+
+        ResourceUsage.objects.bulk_update(
+            expired_usages, ['end_time', 'auto_released', 'is_active', 'actual_duration']
+        )
+        ResourceUsage.objects.bulk_create(new_usages)
+        ResourceQueue.objects.filter(id__in=consumed_queue_ids).update(is_active=False)
+        Resource.objects.filter(id__in=freed_resource_ids).update(status='Available', updated_at=now)
 
-    if expired_count > 0:
-        SystemLog.objects.create(
+        expired_count = len(expired_usages)
+        logs.append(SystemLog(
             log_type='SYSTEM',
             message=f'Cleaned up {expired_count} expired sessions'
-        )
+        ))
+        SystemLog.objects.bulk_create(logs)
+        transaction.on_commit(bump_status_version)
+
+    return f"Cleaned up {expired_count} expired sessions"
+
+@shared_task
+def update_queue_estimates():
+    """Refresh estimated wait times for every active queue entry"""
+    from .models import ResourceUsage, ResourceQueue
+
+    now = timezone.now()
+    # Deadline of the current usage per resource (latest wins, as in get_current_usage)
+    deadlines = dict(
+        ResourceUsage.objects.filter(end_time__isnull=True)
+        .order_by('start_time').values_list('resource_id', 'deadline')
+    )
+    entries = list(
+        ResourceQueue.objects.filter(is_active=True, resource_id__in=deadlines)
+        .order_by('resource_id', 'joined_at')
+    )
+
+    # Wait = remaining time of the current usage + minutes requested by users ahead
+    minutes_ahead = {}
+    for entry in entries:
+        remaining = max(0, int((deadlines[entry.resource_id] - now).total_seconds()))
+        ahead = minutes_ahead.get(entry.resource_id, 0)
+        entry.estimated_wait_time = timedelta(seconds=remaining + ahead * 60)
+        minutes_ahead[entry.resource_id] = ahead + entry.requested_minutes
+
+    ResourceQueue.objects.bulk_update(entries, ['estimated_wait_time'])
+    return f"Updated {len(entries)} queue estimates"
+
+@shared_task
+def write_system_logs(entries):
+    """Insert a batch of SystemLog rows given as dicts of field values"""
+    from .models import SystemLog
 
-    return f"Cleaned up {expired_count} expired sessions"
\ No newline at end of file
+    SystemLog.objects.bulk_create([SystemLog(**entry) for entry in entries], batch_size=500)
@@ -9,10 +9,43 @@ from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.db import transaction, IntegrityError
+from django.db.models import Count, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
 from django.contrib.auth.models import User
 
 from .models import Resource, ResourceUsage, ResourceQueue, SystemLog, UserSession
 from .forms import LoginForm, UsageTimeForm
+from .status_cache import STATUS_CACHE_TIMEOUT, bump_status_version, status_cache_key
+from .system_log import queue_system_log
+from .views_theme import session_theme
+
+def _active_resources():
+    """Active resources with their current usage and active queue prefetched.
+
+    Each resource gets `_active_usages` (read via `resource.current_usage`) and
+    `active_queue` (ordered by join time, users selected). Only the columns the
+    dashboard and status payload render are loaded.
+    """
+    return Resource.objects.filter(is_active=True).only(
+        'id', 'pc_name', 'ip_address', 'resource_type', 'status'
+    ).prefetch_related(
+        Prefetch(
+            'usages',
+            queryset=ResourceUsage.objects.filter(end_time__isnull=True).select_related('user').only(
+                'id', 'resource', 'user', 'start_time', 'end_time', 'deadline', 'is_active',
+                'user__username'
+            ),
+            to_attr='_active_usages'
+        ),
+        Prefetch(
+            'queue_entries',
+            queryset=ResourceQueue.objects.filter(is_active=True).select_related('user').only(
+                'id', 'resource', 'user', 'joined_at', 'requested_minutes', 'user__username'
+            ).order_by('joined_at'),
+            to_attr='active_queue'
+        ),
+    )
 
 def login_view(request):
     """Handle user login"""
@@ -27,9 +60,11 @@ def login_view(request):
             user = authenticate(request, username=username, password=password)
             if user:
                 login(request, user)
-                # Create or update user session data
-                session_data, created = UserSession.objects.get_or_create(user=user)
-                session_data.save()
+                # Templates read the theme from the session from here on
+                session_theme(request)
+                # Touch the user's session data, creating it on first login
+                if not UserSession.objects.filter(user=user).update(last_activity=timezone.now()):
+                    UserSession.objects.get_or_create(user=user)
 
                 SystemLog.objects.create(
                     log_type='USER',
@@ -60,37 +95,41 @@ def logout_view(request):
 @login_required
 def dashboard(request):
     """Main dashboard view showing all resources"""
-    resources = Resource.objects.filter(is_active=True).prefetch_related('usages', 'queue_entries')
+    # Load current usages, active queues and the user's queue membership in
+    # a fixed number of queries instead of several per resource
+    resources = _active_resources().annotate(
+        _queue_count=Count('queue_entries', filter=Q(queue_entries__is_active=True)),
+    )
+    my_queues = frozenset(ResourceQueue.objects.filter(
+        user=request.user,
+        is_active=True
+    ).values_list('resource_id', flat=True))
 
-    # Update expired sessions
-    update_expired_sessions()
+    # Expired sessions are released by the cleanup-expired-sessions beat task
 
+    # Summary counts are tallied in the same pass to avoid template
+    # concatenation issues and extra passes over the resource list
     resource_data = []
+    available_count = occupied_count = queue_total = 0
     for resource in resources:
-        current_usage = resource.get_current_usage()
-        queue_count = resource.get_queue_count()
-
-        user_in_queue = ResourceQueue.objects.filter(
-            resource=resource,
-            user=request.user,
-            is_active=True
-        ).exists()
+        current_usage = resource.current_usage
 
         resource_info = {
             'resource': resource,
             'current_usage': current_usage,
-            'queue_count': queue_count,
-            'user_in_queue': user_in_queue,
+            'queue_count': resource.queue_count,
+            'user_in_queue': resource.id in my_queues,
             'remaining_time': current_usage.get_remaining_time() if current_usage else 0,
-            'is_current_user': current_usage.user == request.user if current_usage else False,
+            'is_current_user': current_usage.user_id == request.user.id if current_usage else False,
         }
         resource_data.append(resource_info)
 
-    # Compute summary counts to avoid template concatenation issues
+        if resource.status == 'Available':
+            available_count += 1
+        elif resource.status == 'Occupied':
+            occupied_count += 1
+        queue_total += resource.queue_count
     total_resources = len(resource_data)
-    available_count = sum(1 for d in resource_data if d['resource'].status == 'Available')
-    occupied_count = sum(1 for d in resource_data if d['resource'].status == 'Occupied')
-    queue_total = sum(d['queue_count'] for d in resource_data)
 
     return render(request, 'resource_manager/dashboard.html', {
         'resource_data': resource_data,
@@ -117,32 +156,39 @@ def occupy_resource(request):
 
             # Note: allow a single user to occupy multiple resources simultaneously
 
-            # Create new usage session
-            # Ensure no other active usage exists for the resource (single occupant)
-            if resource.get_current_usage():
+            # Create new usage session; the uniq_active_usage_per_resource
+            # constraint guarantees a single occupant
+            try:
+                with transaction.atomic():
+                    usage = ResourceUsage.objects.create(
+                        resource=resource,
+                        user=request.user,
+                        planned_duration=timedelta(minutes=minutes)
+                    )
+            except IntegrityError:
                 return JsonResponse({'success': False, 'message': 'Resource is already in use'})
 
-            usage = ResourceUsage.objects.create(
-                resource=resource,
-                user=request.user,
-                planned_duration=timedelta(minutes=minutes)
-            )
-
             # Update resource status
             resource.status = 'Occupied'
-            resource.save()
+            resource.save(update_fields=['status', 'updated_at'])
 
             # Log the action
-            SystemLog.objects.create(
+            queue_system_log(
                 log_type='RESOURCE',
-                user=request.user,
-                resource=resource,
+                user_id=request.user.id,
+                resource_id=resource.id,
                 message=f'Resource {resource.pc_name} occupied for {minutes} minutes',
                 details={'duration_minutes': minutes}
             )
 
-            messages.success(request, f'Successfully occupied {resource.pc_name}')
-            return JsonResponse({'success': True, 'message': 'Resource occupied successfully'})
+            transaction.on_commit(bump_status_version)
+
+        # Built after commit so the refreshed status reflects this change
+        return JsonResponse({
+            'success': True,
+            'message': 'Resource occupied successfully',
+            'status': _build_status_payload(request)
+        })
 
     except Resource.DoesNotExist:
         return JsonResponse({'success': False, 'message': 'Resource not found'})
@@ -157,17 +203,23 @@ def release_resource(request):
 
     try:
         with transaction.atomic():
-            resource = Resource.objects.select_for_update().get(id=resource_id)
-            current_usage = resource.get_current_usage()
+            # Lock the caller's open usage together with its resource row
+            current_usage = ResourceUsage.objects.select_for_update().select_related('resource').filter(
+                resource_id=resource_id,
+                user=request.user,
+                is_active=True,
+                end_time__isnull=True
+            ).first()
 
-            if not current_usage or current_usage.user != request.user:
+            if not current_usage:
                 return JsonResponse({'success': False, 'message': 'You do not have access to this resource'})
+            resource = current_usage.resource
 
             # End the usage session
             current_usage.end_time = timezone.now()
             current_usage.actual_duration = current_usage.end_time - current_usage.start_time
             current_usage.is_active = False
-            current_usage.save()
+            current_usage.save(update_fields=['end_time', 'actual_duration', 'is_active'])
 
             # Check for queued users
             next_in_queue = ResourceQueue.objects.filter(
@@ -185,31 +237,34 @@ def release_resource(request):
 
                 # Remove from queue
                 next_in_queue.is_active = False
-                next_in_queue.save()
+                next_in_queue.save(update_fields=['is_active'])
 
-                SystemLog.objects.create(
+                queue_system_log(
                     log_type='RESOURCE',
-                    user=next_in_queue.user,
-                    resource=resource,
+                    user_id=next_in_queue.user_id,
+                    resource_id=resource.id,
                     message=f'Resource {resource.pc_name} auto-assigned from queue'
                 )
             else:
                 # Make resource available
                 resource.status = 'Available'
-                resource.save()
+                resource.save(update_fields=['status', 'updated_at'])
 
-            SystemLog.objects.create(
+            queue_system_log(
                 log_type='RESOURCE',
-                user=request.user,
-                resource=resource,
+                user_id=request.user.id,
+                resource_id=resource.id,
                 message=f'Resource {resource.pc_name} released'
             )
 
-            messages.success(request, f'Successfully released {resource.pc_name}')
-            return JsonResponse({'success': True, 'message': 'Resource released successfully'})
+            transaction.on_commit(bump_status_version)
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Resource released successfully',
+            'status': _build_status_payload(request)
+        })
 
-    except Resource.DoesNotExist:
-        return JsonResponse({'success': False, 'message': 'Resource not found'})
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
 
@@ -223,42 +278,39 @@ def join_queue(request):
     try:
         resource = get_object_or_404(Resource, id=resource_id, is_active=True)
 
-        # Attempt to create an active queue entry; be defensive about races
+        # Insert the entry with its position computed in the same statement;
+        # the one_active_queue_entry constraint rejects duplicates
+        queue_size = ResourceQueue.objects.filter(
+            resource=resource,
+            is_active=True
+        ).order_by().values('resource').annotate(c=Count('pk')).values('c')
         try:
-            # position is optional; compute a simple default
-            position = ResourceQueue.objects.filter(resource=resource, is_active=True).count() + 1
-            queue_entry, created = ResourceQueue.objects.get_or_create(
-                resource=resource,
-                user=request.user,
-                is_active=True,
-                defaults={'position': position, 'requested_minutes': requested_minutes}
-            )
+            with transaction.atomic():
+                ResourceQueue.objects.create(
+                    resource=resource,
+                    user=request.user,
+                    is_active=True,
+                    position=Coalesce(Subquery(queue_size), 0) + 1,
+                    requested_minutes=requested_minutes
+                )
         except IntegrityError:
-            # A concurrent request likely created the same active tuple — fetch it
-            queue_entry = ResourceQueue.objects.filter(
-                resource=resource,
-                user=request.user,
-                is_active=True
-            ).first()
-            created = False
-
-        if not created and queue_entry:
             return JsonResponse({'success': False, 'message': 'You are already in the queue'})
 
-        # If created is True we have successfully added the user to the queue
-        # Ensure estimated wait time is initialized
-        # (queue_entry exists here and may be newly created)
-        queue_entry.update_estimated_wait_time()
+        # Estimated wait times are refreshed by the update-queue-estimates beat task
 
-        SystemLog.objects.create(
+        queue_system_log(
             log_type='RESOURCE',
-            user=request.user,
-            resource=resource,
+            user_id=request.user.id,
+            resource_id=resource.id,
             message=f'User joined queue for {resource.pc_name}'
         )
 
-        messages.success(request, f'Successfully joined queue for {resource.pc_name}')
-        return JsonResponse({'success': True, 'message': 'Successfully joined queue'})
+        bump_status_version()
+        return JsonResponse({
+            'success': True,
+            'message': 'Successfully joined queue',
+            'status': _build_status_payload(request)
+        })
 
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
@@ -272,36 +324,28 @@ def leave_queue(request):
     try:
         resource = get_object_or_404(Resource, id=resource_id)
 
-        with transaction.atomic():
-            queue_entry = ResourceQueue.objects.select_for_update().filter(
-                resource=resource,
-                user=request.user,
-                is_active=True
-            ).first()
-
-            if not queue_entry:
-                return JsonResponse({'success': False, 'message': 'You are not in the queue'})
-
-            # Remove any historical inactive entries for this (resource, user) to
-            # avoid violating the unique_together constraint when we flip the flag.
-            ResourceQueue.objects.filter(
-                resource=resource,
-                user=request.user,
-                is_active=False
-            ).delete()
+        left = ResourceQueue.objects.filter(
+            resource=resource,
+            user=request.user,
+            is_active=True
+        ).update(is_active=False)
 
-            queue_entry.is_active = False
-            queue_entry.save()
+        if not left:
+            return JsonResponse({'success': False, 'message': 'You are not in the queue'})
 
-        SystemLog.objects.create(
+        queue_system_log(
             log_type='RESOURCE',
-            user=request.user,
-            resource=resource,
+            user_id=request.user.id,
+            resource_id=resource.id,
             message=f'User left queue for {resource.pc_name}'
         )
 
-        messages.success(request, f'Successfully left queue for {resource.pc_name}')
-        return JsonResponse({'success': True, 'message': 'Successfully left queue'})
+        bump_status_version()
+        return JsonResponse({
+            'success': True,
+            'message': 'Successfully left queue',
+            'status': _build_status_payload(request)
+        })
 
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
@@ -314,22 +358,28 @@ def extend_time(request):
     extension_minutes = int(request.POST.get('minutes', 15))
 
     try:
-        resource = get_object_or_404(Resource, id=resource_id)
-        current_usage = resource.get_current_usage()
+        current_usage = ResourceUsage.objects.select_related('resource').filter(
+            resource_id=resource_id,
+            user=request.user,
+            is_active=True,
+            end_time__isnull=True
+        ).first()
 
-        if not current_usage or current_usage.user != request.user:
+        if not current_usage:
             return JsonResponse({'success': False, 'message': 'No active session found'})
+        resource = current_usage.resource
 
         if current_usage.is_expired():
             return JsonResponse({'success': False, 'message': 'Session has already expired'})
 
         # Extend time
         current_usage.extend_time(extension_minutes)
+        bump_status_version()
 
-        SystemLog.objects.create(
+        queue_system_log(
             log_type='RESOURCE',
-            user=request.user,
-            resource=resource,
+            user_id=request.user.id,
+            resource_id=resource.id,
             message=f'Extended time by {extension_minutes} minutes for {resource.pc_name}',
             details={'extension_minutes': extension_minutes}
         )
@@ -337,23 +387,27 @@ def extend_time(request):
         return JsonResponse({
             'success': True, 
             'message': f'Time extended by {extension_minutes} minutes',
-            'new_remaining_time': current_usage.get_remaining_time()
+            'new_remaining_time': current_usage.get_remaining_time(),
+            'status': _build_status_payload(request)
         })
 
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)})
 
-@login_required
-def get_status(request):
-    """Get current status of resources for AJAX updates"""
-    resources = Resource.objects.filter(is_active=True)
+def _build_status_payload(request):
+    """Status payload for the requesting user, served from the short-lived cache"""
+    cache_key = status_cache_key(request.user.id)
+    payload = cache.get(cache_key)
+    if payload is not None:
+        return payload
+
+    resources = _active_resources()
     status_data = []
     for resource in resources:
-        current_usage = resource.get_current_usage()
+        current_usage = resource.current_usage
 
-        queue_entries = resource.queue_entries.filter(is_active=True).order_by('joined_at')
-        queue_list = [{'username': q.user.username, 'minutes': q.requested_minutes} for q in queue_entries]
-        user_in_queue = queue_entries.filter(user=request.user).exists()
+        queue_list = [{'username': q.user.username, 'minutes': q.requested_minutes} for q in resource.active_queue]
+        user_in_queue = any(q.user_id == request.user.id for q in resource.active_queue)
 
         resource_status = {
             'id': resource.id,
@@ -361,7 +415,7 @@ def get_status(request):
             'ip_address': resource.ip_address,
             'resource_type': resource.resource_type,
             'status': resource.status,
-            'queue_count': resource.get_queue_count(),
+            'queue_count': len(resource.active_queue),
             'queue_list': queue_list,
             'current_user': None,
             'remaining_time': 0,
@@ -375,54 +429,16 @@ def get_status(request):
                 'current_user': current_usage.user.username,
                 'start_time': current_usage.start_time.strftime('%Y-%m-%d %H:%M:%S'),
                 'remaining_time': current_usage.get_remaining_time(),
-                'is_current_user': current_usage.user == request.user,
+                'is_current_user': current_usage.user_id == request.user.id,
             })
 
         status_data.append(resource_status)
 
-    return JsonResponse({'resources': status_data})
-
-def update_expired_sessions():
-    """Update expired resource sessions"""
-    expired_usages = ResourceUsage.objects.filter(
-        end_time__isnull=True,
-        is_active=True
-    )
-
-    for usage in expired_usages:
-        if usage.is_expired():
-            with transaction.atomic():
-                # Mark as expired and auto-released
-                usage.end_time = timezone.now()
-                usage.auto_released = True
-                usage.is_active = False
-                usage.actual_duration = usage.end_time - usage.start_time
-                usage.save()
-
-                # Handle queue
-                resource = usage.resource
-                next_in_queue = ResourceQueue.objects.filter(
-                    resource=resource,
-                    is_active=True
-                ).order_by('joined_at').first()
-
-                if next_in_queue:
-                    # Auto-assign to next user
-                    ResourceUsage.objects.create(
-                        resource=resource,
-                        user=next_in_queue.user,
-                        planned_duration=timedelta(hours=1)
-                    )
-                    next_in_queue.is_active = False
-                    next_in_queue.save()
-                else:
-                    # Make available
-                    resource.status = 'Available'
-                    resource.save()
+    payload = {'resources': status_data}
+    cache.set(cache_key, payload, timeout=STATUS_CACHE_TIMEOUT)
+    return payload
 
-                SystemLog.objects.create(
-                    log_type='SYSTEM',
-                    user=usage.user,
-                    resource=resource,
-                    message=f'Session auto-expired for {resource.pc_name}'
-                )
+@login_required
+def get_status(request):
+    """Get current status of resources for AJAX updates"""
+    return JsonResponse(_build_status_payload(request))
@@ -2,11 +2,19 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 
+def session_theme(request):
+    # Served from the session; the profile is only read once to seed it
+    theme = request.session.get('theme')
+    if theme is None:
+        profile = getattr(request.user, 'profile', None)
+        theme = profile.theme if profile else 'light'
+        request.session['theme'] = theme
+    return theme
+
+
 @login_required
 def get_theme(request):
-    profile = getattr(request.user, 'profile', None)
-    theme = profile.theme if profile else 'light'
-    return JsonResponse({'theme': theme})
+    return JsonResponse({'theme': session_theme(request)})
 
 
 @login_required
@@ -18,9 +26,10 @@ def set_theme(request):
     profile = getattr(request.user, 'profile', None)
     if profile:
         profile.theme = theme
-        profile.save()
+        profile.save(update_fields=['theme'])
     else:
         # create quickly
         from .models import UserProfile
         UserProfile.objects.create(user=request.user, theme=theme)
+    request.session['theme'] = theme
     return JsonResponse({'success': True, 'theme': theme})
@@ -24,7 +24,7 @@ from celery.schedules import crontab
 app.conf.beat_schedule = {
     'cleanup-expired-sessions': {
         'task': 'resource_manager.tasks.cleanup_expired_sessions',
-        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+        'schedule': crontab(minute='*'),  # Every minute
     },
     'update-queue-estimates': {
         'task': 'resource_manager.tasks.update_queue_estimates',
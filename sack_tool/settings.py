@@ -112,6 +112,23 @@ SESSION_COOKIE_AGE = 28800  # 8 hours
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Cache (short-lived get_status payloads). Set CACHE_REDIS_URL in production so
+# all worker processes share the cache; local memory is used otherwise.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Channel Layers for WebSockets
 CHANNEL_LAYERS = {
     'default': {
@@ -129,6 +146,13 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Periodic bulk work runs on its own queue so it never delays interactive tasks
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'resource_manager.tasks.cleanup_expired_sessions': {'queue': 'maintenance'},
+    'resource_manager.tasks.update_queue_estimates': {'queue': 'maintenance'},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
 # Resource Management Settings
 RESOURCE_WARNING_TIMES = {
@@ -138,3 +162,7 @@ RESOURCE_WARNING_TIMES = {
 
 RESOURCE_EXTENSION_TIME = 900  # 15 minutes in seconds
 RESOURCE_DEFAULT_TIME = 3600  # 1 hour in seconds
+
+# Write resource/queue SystemLog entries through the Celery worker instead of
+# inside the request. Requires a running worker; off by default for development.
+SYSTEM_LOG_ASYNC = os.environ.get('SYSTEM_LOG_ASYNC') == '1'